@@ -4,7 +4,70 @@ import fitz  # PyMuPDF
 import docx
 import re
 import os
+import shutil
+import signal
+import stat
 import sys
+import multiprocessing
+import queue
+import threading
+import time
+import itertools
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from concurrent.futures import (ProcessPoolExecutor, ThreadPoolExecutor, as_completed,
+                                wait, FIRST_COMPLETED)
+from concurrent.futures.process import BrokenProcessPool
+
+# --------------------------------------------------------------------------
+# Text patterns (compiled once at import, reused for every line of every page)
+# --------------------------------------------------------------------------
+GIFT_MSG_RE = re.compile(r"gift message", re.IGNORECASE)
+
+# Lowercase phrases that end a personalization block
+STOP_KEYWORDS = [
+    "size:",
+    "word or mssg:",
+    "word or message:",
+    "morse code:",
+    "quantity:",
+    "sku:",
+    "private notes",
+    "scheduled to ship by",
+    "note from buyer",
+    "do the green thing",
+    "reuse this paper to make origami, confetti",
+    "or your next to-do list.",
+]
+STOP_RE = re.compile("|".join(re.escape(kw) for kw in STOP_KEYWORDS))
+
+# Lowercase item-option labels; whether they say "custom" decides if the
+# following personalization block is highlighted
+ITEM_DESCRIPTORS = ["word or message:", "word or mssg:", "morse code:"]
+ITEM_DESCRIPTOR_RE = re.compile("|".join(re.escape(d) for d in ITEM_DESCRIPTORS))
+
+# Stamp key => lowercase page-text triggers, in the order stamps are stacked
+STAMP_TRIGGERS = [
+    ("gift", ["gift message"]),
+    ("igb", ["igb"]),
+    ("bubble", ["upgrade label to priority - bubble"]),
+    ("show", ["show kd"]),
+    ("pic", ["pic kd", "pic "]),
+    ("short", ["short thins"]),
+    ("hjlm", ["hjlm"]),
+    ("priority", ["priority box"]),
+    ("fedex", ["fedex"]),
+]
+# One scan over the page text finds every trigger; the lookahead keeps
+# matches zero-width so triggers that share characters are all reported.
+STAMP_TRIGGER_RE = re.compile("(?=" + "|".join(
+    f"(?P<{key}>" + "|".join(re.escape(t) for t in triggers) + ")"
+    for (key, triggers) in STAMP_TRIGGERS
+) + ")")
+
+# (x0, y0, x1, y1, text) of a get_text("words") / get_text("blocks") tuple,
+# without the slice or *rest list that unpacking would allocate per item
+_bbox_and_text = itemgetter(0, 1, 2, 3, 4)
 
 # --------------------------------------------------------------------------
 # Helper: Get resource path (works for PyInstaller bundle)
@@ -18,6 +81,19 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+def load_stamp_streams(stamp_images):
+    """
+    Read every stamp image file once: {key: path} => {key: image bytes}.
+    Missing files are left out, so those stamps are simply not placed.
+    """
+    streams = {}
+    for key, path in stamp_images.items():
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                streams[key] = f.read()
+    return streams
+
+
 # --------------------------------------------------------------------------
 # 1) Helper: place_page_full => top-aligned, minimal whitespace
 # --------------------------------------------------------------------------
@@ -45,27 +121,28 @@ def place_page_full(doc_out_page, doc_in, in_page_index, target_rect):
     )
 
 
-def create_two_up_pdf(input_pdf, output_pdf):
+def _create_two_up(doc_in, output_pdf):
     """
-    Produce a 2-up PDF in A4 LANDSCAPE (842 wide x 595 high).
-    Left half => page i, right => page i+1.
+    Produce a 2-up PDF in A4 LANDSCAPE (842 wide x 595 high) from the
+    already-open `doc_in`. Left half => page i, right => page i+1.
     """
-    doc_in = fitz.open(input_pdf)
-    doc_out = fitz.open()
     num_pages = doc_in.page_count
 
     if num_pages == 0:
         # No pages to process
-        doc_in.close()
         return
 
+    doc_out = fitz.open()
+
     # A4 Landscape
     page_width, page_height = 842, 595
 
+    # Same two tiles on every output page
+    left_rect = fitz.Rect(0, 0, page_width / 2, page_height)
+    right_rect = fitz.Rect(page_width / 2, 0, page_width, page_height)
+
     for i in range(0, num_pages, 2):
         new_page = doc_out.new_page(width=page_width, height=page_height)
-        left_rect = fitz.Rect(0, 0, page_width / 2, page_height)
-        right_rect = fitz.Rect(page_width / 2, 0, page_width, page_height)
 
         # Left page
         try:
@@ -82,24 +159,22 @@ def create_two_up_pdf(input_pdf, output_pdf):
                 pass
 
     doc_out.save(output_pdf)
-    doc_in.close()
     doc_out.close()
 
 
-def create_six_page_thumbnail_pdf(input_pdf, output_pdf):
+def _create_thumbnail(doc_in, output_pdf):
     """
-    Multi-page “thumbnail” PDF in a 3x2 grid, skipping the first (blank) page.
-    Now using A4 PORTRAIT (595 wide x 842 high).
+    Multi-page “thumbnail” PDF in a 3x2 grid from the already-open `doc_in`,
+    skipping the first (blank) page. Now using A4 PORTRAIT (595 wide x 842 high).
     """
-    doc_in = fitz.open(input_pdf)
-    doc_out = fitz.open()
     num_pages = doc_in.page_count
 
     if num_pages < 2:
         # If there's only the inserted blank page or zero pages, nothing to generate
-        doc_in.close()
         return
 
+    doc_out = fitz.open()
+
     # We'll skip the first inserted page (index=0) by default:
     page_indexes = list(range(1, num_pages))
 
@@ -111,19 +186,22 @@ def create_six_page_thumbnail_pdf(input_pdf, output_pdf):
     slot_w = page_width / columns
     slot_h = page_height / rows
 
+    # Grid slots (row by row) are the same on every output page
+    slot_rects = []
+    for i in range(thumbs_per_page):
+        row = i // columns
+        col = i % columns
+        x0 = col * slot_w
+        y0 = row * slot_h
+        x1 = x0 + slot_w
+        y1 = y0 + slot_h
+        slot_rects.append(fitz.Rect(x0, y0, x1, y1))
+
     for start_idx in range(0, len(page_indexes), thumbs_per_page):
         chunk = page_indexes[start_idx : start_idx + thumbs_per_page]
         new_page = doc_out.new_page(width=page_width, height=page_height)
 
-        for i, src_page_index in enumerate(chunk):
-            row = i // columns
-            col = i % columns
-            x0 = col * slot_w
-            y0 = row * slot_h
-            x1 = x0 + slot_w
-            y1 = y0 + slot_h
-            target_rect = fitz.Rect(x0, y0, x1, y1)
-
+        for target_rect, src_page_index in zip(slot_rects, chunk):
             try:
                 place_page_full(new_page, doc_in, src_page_index, target_rect)
             except ValueError:
@@ -131,20 +209,84 @@ def create_six_page_thumbnail_pdf(input_pdf, output_pdf):
                 pass
 
     doc_out.save(output_pdf)
-    doc_in.close()
     doc_out.close()
 
 
+def create_two_up_pdf(input_pdf, output_pdf):
+    """
+    Produce a 2-up PDF in A4 LANDSCAPE (842 wide x 595 high).
+    Left half => page i, right => page i+1.
+    """
+    doc_in = fitz.open(input_pdf)
+    try:
+        _create_two_up(doc_in, output_pdf)
+    finally:
+        doc_in.close()
+
+
+def create_six_page_thumbnail_pdf(input_pdf, output_pdf):
+    """
+    Multi-page “thumbnail” PDF in a 3x2 grid, skipping the first (blank) page.
+    Now using A4 PORTRAIT (595 wide x 842 high).
+    """
+    doc_in = fitz.open(input_pdf)
+    try:
+        _create_thumbnail(doc_in, output_pdf)
+    finally:
+        doc_in.close()
+
+
 # --------------------------------------------------------------------------
 # 2) Main PDF Processing
 # --------------------------------------------------------------------------
+def save_rows_docx(rows, heading, docx_path):
+    """
+    Write extracted `rows` = [(page_index, text), ...] to a Word doc at
+    `docx_path`, one "[Page N] text" paragraph per row under `heading`.
+    """
+    out_doc = docx.Document()
+    out_doc.add_heading(heading, level=1)
+    for (page_index, text) in rows:
+        p = out_doc.add_paragraph()
+        p.add_run(f"[Page {page_index}] ").bold = True
+        p.add_run(text)
+    out_doc.save(docx_path)
+
+
 def process_pdf_file(pdf_path,
                      output_pdf_path,
                      word_output_path,
                      personalization_word_path,
-                     stamp_images,
+                     stamp_streams,
                      watermark_text,
-                     options):
+                     options,
+                     two_up_path=None,
+                     thumb_path=None):
+    """
+    Process one PDF (see `_process_pdf` for the steps) and write its Word docs.
+
+    Returns the status line(s) to log.
+    """
+    messages, docx_jobs = _process_pdf(pdf_path, output_pdf_path, word_output_path,
+                                       personalization_word_path, stamp_streams,
+                                       watermark_text, options, two_up_path, thumb_path)
+    try:
+        for job in docx_jobs:
+            save_rows_docx(*job)
+    except Exception as e:
+        return f"Error processing '{os.path.basename(pdf_path)}': {e}"
+    return "\n".join(messages)
+
+
+def _process_pdf(pdf_path,
+                 output_pdf_path,
+                 word_output_path,
+                 personalization_word_path,
+                 stamp_streams,
+                 watermark_text,
+                 options,
+                 two_up_path=None,
+                 thumb_path=None):
     """
     Steps (only performed if corresponding checkboxes are True in 'options'):
 
@@ -152,16 +294,48 @@ def process_pdf_file(pdf_path,
     - Crop pages (if options['crop_pages'])
     - Highlight EXACT "gift message included" (if options['highlight_gmi'])
     - Highlight entire gift message snippet (if options['highlight_gift_snippet'])
-    - Extract gift message & personalization text to Word docs (if options['extract_text'])
+    - Extract gift message & personalization text for Word docs (if options['extract_text'])
     - Highlight personalization lines (if options['highlight_personalization'])
     - Highlight quantity >=2 (if options['highlight_quantity'])
-    - Add stamps (if options['add_stamps'])
+    - Add stamps from `stamp_streams` = {key: image bytes} (if options['add_stamps'])
     - Insert watermark text (if options['apply_watermark'])
-    - Save final PDF
+    - Save final PDF (content streams also rewritten if options['deep_clean_output'];
+      appended to a copy of the input if neither cropping nor deep clean is on)
+    - Write 2-up / thumbnail PDFs to `two_up_path` / `thumb_path` (default:
+      <name>_2up.pdf / <name>_thumb.pdf next to `output_pdf_path`) straight
+      from the in-memory result (if options['generate_2up_thumbs'])
+
+    The Word docs are not written here. Returns `(messages, docx_jobs)`: the
+    status lines to log and a list of `(rows, heading, docx_path)` argument
+    tuples for `save_rows_docx`, so the caller decides where the (pure disk
+    I/O) docx writing happens.
     """
+    doc = None
+    output_is_bare_copy = False   # output_pdf_path holds the unmodified copy (see below)
     try:
-        # Open input PDF and insert blank page at the beginning
-        doc = fitz.open(pdf_path)
+        # Deep clean is an optional key, so older option dicts still work
+        deep_clean = options.get('deep_clean_output', False)
+
+        # Without cropping or deep clean, nothing in the input needs rewriting: the output
+        # is a copy of the input with our changes appended as an incremental update, so the
+        # save costs O(changes) instead of O(file size)
+        save_incremental = not options['crop_pages'] and not deep_clean
+
+        # Open input PDF (or that copy) and insert blank page at the beginning
+        if save_incremental:
+            shutil.copyfile(pdf_path, output_pdf_path)
+            output_is_bare_copy = True
+            doc = fitz.open(output_pdf_path)
+            if (not doc.can_save_incrementally()
+                    or doc.is_encrypted or doc.metadata.get("encryption")):
+                # Fall back to a full save if MuPDF had to repair a damaged xref, or if the
+                # input is encrypted: a full save writes it unencrypted, and the output
+                # mustn't depend on whether cropping is on
+                doc.close()
+                doc = None
+                save_incremental = False
+        if doc is None:
+            doc = fitz.open(pdf_path)
         doc.insert_page(0)
         total_pages = doc.page_count
 
@@ -176,21 +350,14 @@ def process_pdf_file(pdf_path,
         gift_trigger_phrases = ["gift message"]
 
         personalization_marker = "personalization:"
-        item_descriptors = ["word or message:", "word or mssg:", "morse code:"]
-
-        # Prepare docx only if extracting is enabled
-        if options['extract_text']:
-            gift_doc = docx.Document()
-            gift_doc.add_heading("Extracted Gift Messages", level=1)
 
-            personalization_doc = docx.Document()
-            personalization_doc.add_heading("Extracted Personalizations", level=1)
-        else:
-            gift_doc = None
-            personalization_doc = None
+        # Extracted text is collected as (page_index, text) rows and only
+        # turned into Word docs once, after all pages are processed
+        gift_rows = []
+        personalization_rows = []
 
-        # We'll track gift messages so we don't duplicate in the doc
-        gift_messages_per_page = {}
+        # We'll track (page_index, gift message) so we don't duplicate in the doc
+        seen_gift_messages = set()
 
         # If you want to exclude certain areas from search, define rectangles in inches
         excluded_zones_inch = [
@@ -207,58 +374,114 @@ def process_pdf_file(pdf_path,
             x1 = inches_to_points(right_in)
             y0 = page_h - inches_to_points(top_in)
             y1 = page_h - inches_to_points(bottom_in)
-            return fitz.Rect(min(x0,x1), min(y0,y1), max(x0,x1), max(y0,y1))
+            # Plain (x0, y0, x1, y1) floats: only used for raw overlap tests
+            return (min(x0,x1), min(y0,y1), max(x0,x1), max(y0,y1))
+
+        # Excluded rects only depend on the page height, which is the same for
+        # (nearly) every page of a document: compute them once per height.
+        excluded_rects_by_height = {}
 
         def get_excluded_rects(page):
-            rects = []
-            for (lft, rgt, top, bot) in excluded_zones_inch:
-                rects.append(inches_to_rect(page, lft, rgt, top, bot))
+            page_h = page.rect.height
+            rects = excluded_rects_by_height.get(page_h)
+            if rects is None:
+                rects = []
+                for (lft, rgt, top, bot) in excluded_zones_inch:
+                    rects.append(inches_to_rect(page, lft, rgt, top, bot))
+                excluded_rects_by_height[page_h] = rects
             return rects
 
-        def get_lines(page):
+        def get_lines(p_dict, all_words):
             """
             Returns a list of (line_text, line_rect, word_list),
             where word_list = [(x0,y0,x1,y1, text_of_word), ...]
+
+            `p_dict` / `all_words` are the page's get_text("dict") and
+            get_text("words") results, extracted once per page by the caller.
             """
             result = []
-            p_dict = page.get_text("dict")
             if not p_dict:
                 return result
 
-            all_words = page.get_text("words")  # for building line word lists
-
+            # Pass 1: line text + line bbox, kept as raw floats
+            lines = []
             for block in p_dict.get("blocks", []):
                 for line in block.get("lines", []):
                     line_text = ""
-                    line_rect = None
+                    bbox = None
                     for span in line.get("spans", []):
-                        span_rect = fitz.Rect(span["bbox"])
-                        if line_rect is None:
-                            line_rect = span_rect
-                        else:
-                            line_rect |= span_rect
+                        sx0, sy0, sx1, sy1 = span["bbox"]
+                        if bbox is None or bbox[2] <= bbox[0] or bbox[3] <= bbox[1]:
+                            bbox = (sx0, sy0, sx1, sy1)
+                        elif sx1 > sx0 and sy1 > sy0:
+                            # same as Rect union: empty span boxes are ignored
+                            bbox = (min(bbox[0], sx0), min(bbox[1], sy0),
+                                    max(bbox[2], sx1), max(bbox[3], sy1))
                         line_text += span.get("text", "")
                     line_text = line_text.strip()
-                    if not line_text or not line_rect:
+                    if not line_text or not bbox or not any(bbox):
                         continue
+                    lines.append((line_text, bbox, []))
 
-                    # Build the word_list for that line:
-                    word_list = []
-                    for w in all_words:
-                        wx0, wy0, wx1, wy1, wtext = w[:5]
-                        w_rect = fitz.Rect(wx0, wy0, wx1, wy1)
-                        # If the word rect intersects the line rect, consider it part of the line
-                        if w_rect.intersects(line_rect):
-                            word_list.append((wx0, wy0, wx1, wy1, wtext))
-                    # Sort them in reading order
-                    word_list.sort(key=lambda x: (round(x[1], 1), x[0]))
-
-                    result.append((line_text, line_rect, word_list))
+            if not lines:
+                return result
+
+            # Pass 2: hand each word to the line whose bbox holds the word's centre.
+            # Lines are indexed by top edge, so only lines starting between
+            # (centre - tallest line) and centre need to be checked.
+            by_top = sorted((bbox[1], i) for i, (_, bbox, _) in enumerate(lines))
+            tops = [top for (top, _) in by_top]
+            lines_by_top = [lines[i] for (_, i) in by_top]
+            max_line_h = max(bbox[3] - bbox[1] for (_, bbox, _) in lines)
+
+            # MuPDF emits words line by line, so the line that took the previous
+            # word nearly always takes this one too: check it before bisecting.
+            prev_bbox = None
+            prev_words = None
+
+            # Words are stored with their reading-order key up front,
+            # (round(y0, 1), x0, position in all_words), so the per-line sort
+            # below is a plain tuple sort with no Python key function.
+            for seq, w in enumerate(all_words):
+                wx0, wy0, wx1, wy1, wtext = _bbox_and_text(w)
+                xc = (wx0 + wx1) / 2
+                yc = (wy0 + wy1) / 2
+                keyed_word = (round(wy0, 1), wx0, seq, (wx0, wy0, wx1, wy1, wtext))
+
+                if (prev_bbox is not None
+                        and prev_bbox[1] <= yc <= prev_bbox[3]
+                        and prev_bbox[0] <= xc <= prev_bbox[2]):
+                    prev_words.append(keyed_word)
+                    continue
+
+                lo = bisect_left(tops, yc - max_line_h)
+                hi = bisect_right(tops, yc)
+                for j in range(lo, hi):
+                    _, bbox, keyed_words = lines_by_top[j]
+                    if yc <= bbox[3] and bbox[0] <= xc <= bbox[2]:
+                        keyed_words.append(keyed_word)
+                        prev_bbox = bbox
+                        prev_words = keyed_words
+                        break
+
+            for (line_text, bbox, keyed_words) in lines:
+                # Sort them in reading order
+                keyed_words.sort()
+                word_list = [kw[3] for kw in keyed_words]
+                result.append((line_text, fitz.Rect(bbox), word_list))
             return result
 
         # Common crop rectangle
         crop_rect = fitz.Rect(0, 105, 612, 792)
 
+        # The watermark text is the same on every page: decide once whether it's drawn.
+        # "ship to" names are only used for the watermark listing on page0.
+        show_watermark = options['apply_watermark'] and bool(watermark_text.strip())
+        collect_ship_to = show_watermark
+
+        # Image xref of each stamp already embedded in this document
+        stamp_xrefs = {}
+
         # We'll also store "ship to" info for watermark text on page0
         ship_to_info = []
 
@@ -272,13 +495,41 @@ def process_pdf_file(pdf_path,
             if options['crop_pages']:
                 page.set_mediabox(crop_rect)
 
-            # Prepare to store gift messages found on this page
-            gift_messages_per_page[page_index] = set()
+            # Lay out the page text once (after cropping) and run every extraction
+            # and search below on that TextPage; annotations added later don't
+            # change the text. Same flags as a default get_text("dict") (image
+            # blocks kept, CIDs for glyphs without a Unicode mapping).
+            textpage = page.get_textpage(flags=fitz.TEXTFLAGS_DICT)
+            p_blocks = page.get_text("blocks", textpage=textpage)
+            p_text_lower = page.get_text(textpage=textpage).lower()
+
+            # The line/word structure is only needed by (D), (E) and (F); skip
+            # building it on pages where none of them can find its keyword.
+            check_personalization = (
+                (options['extract_text'] or options['highlight_personalization'])
+                and personalization_marker in p_text_lower
+            )
+            check_quantity = options['highlight_quantity'] and "quantity:" in p_text_lower
+            check_ship_to = collect_ship_to and "ship to" in p_text_lower
+            if check_personalization or check_quantity or check_ship_to:
+                lines_data = get_lines(
+                    page.get_text("dict", textpage=textpage),
+                    page.get_text("words", textpage=textpage)
+                )
+            else:
+                lines_data = []
+
+            # Whitespace-collapsed copy, so a phrase wrapped over two lines
+            # still passes the cheap "is it on this page at all" check
+            # before we pay for a full search_for()
+            p_text_flat = " ".join(p_text_lower.split())
 
             # (B) Highlight EXACT "gift message included"
             if options['highlight_gmi']:
                 for phrase in highlight_only_phrases:
-                    hits = page.search_for(phrase, flags=1)  # case-insensitive
+                    if phrase not in p_text_flat:
+                        continue
+                    hits = page.search_for(phrase, textpage=textpage)  # case-insensitive
                     for inst in hits:
                         hl = page.add_highlight_annot(inst)
                         hl.set_colors(stroke=purple_color)
@@ -289,37 +540,47 @@ def process_pdf_file(pdf_path,
             do_text_extraction = options['extract_text']
 
             if do_snippet_highlight or do_text_extraction:
+                # Expand rectangle around "gift message"
+                expand_left  = 36
+                expand_right = 36
+                expand_up    = 72
+                expand_down  = 216
+
+                # Blocks outside the excluded zones, filtered once per page (not per hit).
+                # Overlap tests below match Rect.intersects, on raw floats.
+                candidate_blocks = None
+
                 for phrase in gift_trigger_phrases:
-                    hits = page.search_for(phrase, flags=1)
+                    if phrase not in p_text_flat:
+                        continue
+                    hits = page.search_for(phrase, textpage=textpage)
                     if not hits:
                         continue
 
-                    for inst in hits:
-                        # Expand rectangle around "gift message"
-                        expand_left  = 36
-                        expand_right = 36
-                        expand_up    = 72
-                        expand_down  = 216
-                        expanded_rect = fitz.Rect(
-                            inst.x0 - expand_left,
-                            inst.y0 - expand_down,
-                            inst.x1 + expand_right,
-                            inst.y1 + expand_up
-                        )
-
-                        # gather text blocks that intersect expanded_rect
-                        blocks = page.get_text("blocks")
+                    if candidate_blocks is None:
                         excluded_rects = get_excluded_rects(page)
-                        snippet_blocks = []
-                        for b in blocks:
-                            bx0, by0, bx1, by1, btext, *rest = b
-                            block_rect = fitz.Rect(bx0, by0, bx1, by1)
-                            if not block_rect.intersects(expanded_rect):
+                        candidate_blocks = []
+                        for b in p_blocks:
+                            bx0, by0, bx1, by1, btext = _bbox_and_text(b)
+                            if bx1 <= bx0 or by1 <= by0:
                                 continue
                             # skip blocks that intersect excluded rect
-                            if any(block_rect.intersects(exr) for exr in excluded_rects):
+                            if any(bx0 < zx1 and zx0 < bx1 and by0 < zy1 and zy0 < by1
+                                   for (zx0, zy0, zx1, zy1) in excluded_rects):
                                 continue
-                            snippet_blocks.append((btext.strip(), block_rect))
+                            candidate_blocks.append((bx0, by0, bx1, by1, btext))
+
+                    for inst in hits:
+                        ex0 = inst.x0 - expand_left
+                        ey0 = inst.y0 - expand_down
+                        ex1 = inst.x1 + expand_right
+                        ey1 = inst.y1 + expand_up
+
+                        # gather text blocks that intersect the expanded rect
+                        snippet_blocks = []
+                        for (bx0, by0, bx1, by1, btext) in candidate_blocks:
+                            if bx0 < ex1 and ex0 < bx1 and by0 < ey1 and ey0 < by1:
+                                snippet_blocks.append((btext.strip(), fitz.Rect(bx0, by0, bx1, by1)))
 
                         # Build big snippet text
                         snippet_text = "\n".join([nb[0] for nb in snippet_blocks])
@@ -329,7 +590,7 @@ def process_pdf_file(pdf_path,
                         capturing = False
                         captured_lines = []
                         for ln in lines:
-                            if re.search(r"gift message", ln, re.IGNORECASE):
+                            if GIFT_MSG_RE.search(ln):
                                 if not capturing:
                                     capturing = True  # start from this line
                                 else:
@@ -342,13 +603,11 @@ def process_pdf_file(pdf_path,
                         final_text = "\n".join(captured_lines).strip()
 
                         # If we extracted something new, handle duplication checks
-                        if final_text and do_text_extraction and gift_doc:
-                            if final_text not in gift_messages_per_page[page_index]:
-                                gift_messages_per_page[page_index].add(final_text)
-                                # add to Word doc
-                                p = gift_doc.add_paragraph()
-                                p.add_run(f"[Page {page_index}] ").bold = True
-                                p.add_run(final_text)
+                        if final_text and do_text_extraction:
+                            gift_row = (page_index, final_text)
+                            if gift_row not in seen_gift_messages:
+                                seen_gift_messages.add(gift_row)
+                                gift_rows.append(gift_row)
 
                         # If user wants to highlight entire snippet region
                         if do_snippet_highlight and snippet_blocks:
@@ -356,7 +615,7 @@ def process_pdf_file(pdf_path,
                             bounding_rect = None
                             capturing_blocks = False
                             for (txt, rect) in snippet_blocks:
-                                if re.search(r"gift message", txt, re.IGNORECASE):
+                                if GIFT_MSG_RE.search(txt):
                                     if not capturing_blocks:
                                         capturing_blocks = True
                                     else:
@@ -373,112 +632,53 @@ def process_pdf_file(pdf_path,
                                 big_annot.set_colors(stroke=purple_color)
                                 big_annot.update()
 
-            # (D) Highlight personalization lines if requested, and optionally extract them
-            lines_data = get_lines(page)
+            # (D) personalization lines, (E) quantity >= 2 and (F) "ship to" info are
+            # gathered in a single pass over the page's lines; highlights are added afterwards.
             current_item_has_custom = False
-            # Convert these to lowercase for consistent matching
-            stop_keywords = [
-                "size:",
-                "word or mssg:",
-                "word or message:",
-                "morse code:",
-                "quantity:",
-                "sku:",
-                "private notes",
-                "scheduled to ship by",
-                "note from buyer",
-                "do the green thing",
-                "reuse this paper to make origami, confetti",
-                "or your next to-do list.",
-            ]
-
-            idx = 0
-            while idx < len(lines_data):
-                line_text, line_rect, word_list = lines_data[idx]
+            in_personalization = False
+            personalization_lines = []   # (line_text, word_list)
+            quantity_rects = []
+            found_ship_to = False
+
+            for i, (line_text, line_rect, word_list) in enumerate(lines_data):
                 lower_line = line_text.lower()
 
-                # Check if line indicates a "custom" item
-                is_descriptor = any(desc in lower_line for desc in item_descriptors)
-                if is_descriptor:
-                    current_item_has_custom = ("custom" in lower_line)
-
-                if personalization_marker in lower_line and current_item_has_custom:
-                    # If the user wants to extract text, write it to doc
-                    if do_text_extraction and personalization_doc:
-                        p = personalization_doc.add_paragraph()
-                        p.add_run(f"[Page {page_index}] ").bold = True
-                        p.add_run(line_text)
-
-                    # If user wants to highlight personalization lines
-                    if options['highlight_personalization']:
-                        for (wx0, wy0, wx1, wy1, wtext) in word_list:
-                            if "personalization:" in wtext.lower():
-                                continue
-                            w_rect = fitz.Rect(wx0, wy0, wx1, wy1)
-                            hl_annot = page.add_highlight_annot(w_rect)
-                            hl_annot.set_colors(stroke=yellow_color)
-                            hl_annot.update()
-
-                    # Continue to subsequent lines until we hit stop keywords or another personalization:
-                    next_idx = idx + 1
-                    while next_idx < len(lines_data):
-                        nl_text, nl_rect, nl_words = lines_data[next_idx]
-                        lower_nl_text = nl_text.lower()
-
-                        # If any lowercased stop keyword is in the line, stop
-                        if any(kw in lower_nl_text for kw in stop_keywords):
-                            break
-                        if personalization_marker in lower_nl_text:
+                # (D) Lines after "personalization:" belong to it until we hit
+                # stop keywords or another personalization:
+                if in_personalization:
+                    if STOP_RE.search(lower_line) or personalization_marker in lower_line:
+                        in_personalization = False
+                    else:
+                        personalization_lines.append((line_text, word_list))
+
+                if not in_personalization:
+                    # Check if line indicates a "custom" item
+                    if ITEM_DESCRIPTOR_RE.search(lower_line):
+                        current_item_has_custom = ("custom" in lower_line)
+
+                    if personalization_marker in lower_line and current_item_has_custom:
+                        personalization_lines.append((line_text, word_list))
+                        in_personalization = True
+
+                # (E) Highlight quantity >=2 if user wants
+                if check_quantity and "quantity:" in lower_line:
+                    quantity_index = None
+                    for w_i, (wx0, wy0, wx1, wy1, wtext) in enumerate(word_list):
+                        if wtext.lower().startswith("quantity:"):
+                            quantity_index = w_i
                             break
-
-                        if do_text_extraction and personalization_doc:
-                            p = personalization_doc.add_paragraph()
-                            p.add_run(f"[Page {page_index}] ").bold = True
-                            p.add_run(nl_text)
-
-                        if options['highlight_personalization']:
-                            for (wx0, wy0, wx1, wy1, wtext) in nl_words:
-                                if "personalization:" in wtext.lower():
-                                    continue
-                                w_rect = fitz.Rect(wx0, wy0, wx1, wy1)
-                                hl_annot = page.add_highlight_annot(w_rect)
-                                hl_annot.set_colors(stroke=yellow_color)
-                                hl_annot.update()
-
-                        next_idx += 1
-
-                    idx = next_idx
-                else:
-                    idx += 1
-
-            # (E) Highlight quantity >=2 if user wants
-            if options['highlight_quantity']:
-                lines_data = get_lines(page)
-                for (line_text, line_rect, word_list) in lines_data:
-                    lower_line = line_text.lower()
-                    if "quantity:" in lower_line:
-                        quantity_index = None
-                        for w_i, (wx0, wy0, wx1, wy1, wtext) in enumerate(word_list):
-                            if wtext.lower().startswith("quantity:"):
-                                quantity_index = w_i
-                                break
-                        if quantity_index is not None and (quantity_index + 1) < len(word_list):
-                            nx0, ny0, nx1, ny1, next_text = word_list[quantity_index + 1]
-                            try:
-                                val = int(next_text)
-                                if val >= 2:
-                                    highlight_rect = fitz.Rect(nx0, ny0, nx1, ny1)
-                                    hl_annot = page.add_highlight_annot(highlight_rect)
-                                    hl_annot.set_colors(stroke=yellow_color)
-                                    hl_annot.update()
-                            except:
-                                pass
-
-            # (F) Extract "ship to" info (always done so we can place it on page0 if watermark is used)
-            lines_data = get_lines(page)
-            for i in range(len(lines_data)):
-                line_text, line_rect, word_list = lines_data[i]
-                if "ship to" in line_text.lower():
+                    if quantity_index is not None and (quantity_index + 1) < len(word_list):
+                        nx0, ny0, nx1, ny1, next_text = word_list[quantity_index + 1]
+                        try:
+                            val = int(next_text)
+                            if val >= 2:
+                                quantity_rects.append(fitz.Rect(nx0, ny0, nx1, ny1))
+                        except:
+                            pass
+
+                # (F) Extract "ship to" info (so we can place it on page0 if watermark is used)
+                if check_ship_to and not found_ship_to and "ship to" in lower_line:
+                    found_ship_to = True
                     extracted_name = ""
                     if i + 1 < len(lines_data):
                         next_line_text, _, next_line_words = lines_data[i + 1]
@@ -488,47 +688,62 @@ def process_pdf_file(pdf_path,
                         else:
                             extracted_name = next_line_text
                         ship_to_info.append((page_index, extracted_name))
-                    break
+
+            for (line_text, word_list) in personalization_lines:
+                # If the user wants to extract text, write it to doc
+                if do_text_extraction:
+                    personalization_rows.append((page_index, line_text))
+
+                # If user wants to highlight personalization lines:
+                # one multi-quad annotation per line instead of one per word
+                if options['highlight_personalization']:
+                    word_rects = [
+                        fitz.Rect(wx0, wy0, wx1, wy1)
+                        for (wx0, wy0, wx1, wy1, wtext) in word_list
+                        if "personalization:" not in wtext.lower()
+                    ]
+                    if word_rects:
+                        hl_annot = page.add_highlight_annot(quads=word_rects)
+                        hl_annot.set_colors(stroke=yellow_color)
+                        hl_annot.update()
+
+            for highlight_rect in quantity_rects:
+                hl_annot = page.add_highlight_annot(highlight_rect)
+                hl_annot.set_colors(stroke=yellow_color)
+                hl_annot.update()
+
+            # All text work for this page is done: let the TextPage go
+            # before stamps/text are written, instead of on the next page
+            textpage = None
 
             # (G) Add stamps if user checked "Add Stamps"
             if options['add_stamps']:
-                page_text_lower = page.get_text().lower()
-                found_gift = any(phrase in page_text_lower for phrase in gift_trigger_phrases)
-                stamps_to_insert = []
-
-                if found_gift and stamp_images.get("gift"):
-                    stamps_to_insert.append(stamp_images["gift"])
-                if "igb" in page_text_lower and stamp_images.get("igb"):
-                    stamps_to_insert.append(stamp_images["igb"])
-                if "upgrade label to priority - bubble" in page_text_lower and stamp_images.get("bubble"):
-                    stamps_to_insert.append(stamp_images["bubble"])
-                if "show kd" in page_text_lower and stamp_images.get("show"):
-                    stamps_to_insert.append(stamp_images["show"])
-                if (("pic kd" in page_text_lower) or ("pic " in page_text_lower)) and stamp_images.get("pic"):
-                    stamps_to_insert.append(stamp_images["pic"])
-                if "short thins" in page_text_lower and stamp_images.get("short"):
-                    stamps_to_insert.append(stamp_images["short"])
-                if "hjlm" in page_text_lower and stamp_images.get("hjlm"):
-                    stamps_to_insert.append(stamp_images["hjlm"])
-                if "priority box" in page_text_lower and stamp_images.get("priority"):
-                    stamps_to_insert.append(stamp_images["priority"])
-                # New: detect "fedex"
-                if "fedex" in page_text_lower and stamp_images.get("fedex"):
-                    stamps_to_insert.append(stamp_images["fedex"])
+                found_keys = {m.lastgroup for m in STAMP_TRIGGER_RE.finditer(p_text_lower)}
+                stamps_to_insert = [
+                    key
+                    for (key, _) in STAMP_TRIGGERS
+                    if key in found_keys and stamp_streams.get(key)
+                ]
 
                 page_rect = page.rect
                 # Smaller stamp height, plus reduced distance between stamps
                 stamp_height = 70
                 y_offset = 50
 
-                for stamp_path in stamps_to_insert:
+                for key in stamps_to_insert:
                     stamp_rect = fitz.Rect(
                         page_rect.width - 150,
                         y_offset,
                         page_rect.width - 20,
                         y_offset + stamp_height
                     )
-                    page.insert_image(stamp_rect, filename=stamp_path, keep_proportion=True)
+                    # First use embeds the image; later pages reference the same xref
+                    stamp_xrefs[key] = page.insert_image(
+                        stamp_rect,
+                        stream=stamp_streams[key],
+                        xref=stamp_xrefs.get(key, 0),
+                        keep_proportion=True
+                    )
                     # Increase y_offset by stamp height + 10
                     y_offset += (stamp_height + 10)
 
@@ -541,7 +756,7 @@ def process_pdf_file(pdf_path,
                 fontsize=10,
                 color=(0, 0, 0)
             )
-            if options['apply_watermark'] and watermark_text.strip():
+            if show_watermark:
                 page.insert_text(
                     (page_rect.width - 150, 35),
                     watermark_text,
@@ -551,7 +766,7 @@ def process_pdf_file(pdf_path,
                 )
 
         # (I) On the first blank page, optionally put the 'ship to' info with watermark text
-        if options['apply_watermark'] and watermark_text.strip():
+        if show_watermark:
             page0 = doc[0]
             x, y = 50, 50
             for (pnum, name) in ship_to_info:
@@ -564,31 +779,179 @@ def process_pdf_file(pdf_path,
                 )
                 y += 20
 
-        # Finally, save PDF
-        doc.save(output_pdf_path, garbage=4, deflate=True)
+        # Finally, save PDF. An incremental save only appends the changed objects,
+        # compressed like a full save, but can't merge duplicate streams. A full save
+        # uses garbage=4, which merges the identical streams that every highlight and
+        # inserted text repeats on each page; images and fonts are compressed too.
+        # Deep clean also rewrites the page content streams, which is noticeably slower.
+        if save_incremental:
+            doc.save(
+                output_pdf_path,
+                incremental=True,
+                encryption=fitz.PDF_ENCRYPT_KEEP,
+                deflate=True,
+                deflate_images=True,
+                deflate_fonts=True,
+            )
+        else:
+            doc.save(
+                output_pdf_path,
+                garbage=4,
+                clean=deep_clean,
+                deflate=True,
+                deflate_images=True,
+                deflate_fonts=True,
+            )
+        output_is_bare_copy = False
+        messages = [f"Processed '{os.path.basename(pdf_path)}' successfully."]
+
+        # 2-up and thumbnail are laid out from the in-memory document,
+        # so the file we just wrote doesn't have to be opened and parsed again
+        if options['generate_2up_thumbs']:
+            base = os.path.splitext(os.path.basename(pdf_path))[0]
+            out_dir = os.path.dirname(output_pdf_path)
+            if two_up_path is None:
+                two_up_path = os.path.join(out_dir, base + "_2up.pdf")
+            if thumb_path is None:
+                thumb_path = os.path.join(out_dir, base + "_thumb.pdf")
+            try:
+                _create_two_up(doc, two_up_path)
+                messages.append(f"2-up PDF created for {base}")
+
+                _create_thumbnail(doc, thumb_path)
+                messages.append(f"Thumbnail PDF created for {base}")
+            except Exception as e:
+                messages.append(f"Error creating 2-up/thumbnail PDFs for {base}: {e}")
+
+        # Release the edited document before the Word docs are built, so the
+        # two are never held in memory at the same time
         doc.close()
+        doc = None
 
-        # Save docx if extraction was enabled
-        if options['extract_text'] and gift_doc and personalization_doc:
-            gift_doc.save(word_output_path)
-            personalization_doc.save(personalization_word_path)
+        # Word docs only if extraction was enabled
+        docx_jobs = []
+        if options['extract_text']:
+            docx_jobs.append((gift_rows, "Extracted Gift Messages", word_output_path))
+            docx_jobs.append((personalization_rows, "Extracted Personalizations",
+                              personalization_word_path))
 
-        return f"Processed '{os.path.basename(pdf_path)}' successfully."
+        return messages, docx_jobs
 
     except Exception as e:
-        return f"Error processing '{os.path.basename(pdf_path)}': {e}"
+        return [f"Error processing '{os.path.basename(pdf_path)}': {e}"], []
+
+    finally:
+        # Don't leave the document open when processing failed part-way
+        if doc is not None:
+            doc.close()
+        # ...nor the untouched copy of the input under the output name
+        if output_is_bare_copy:
+            try:
+                os.remove(output_pdf_path)
+            except OSError:
+                pass
+
+
+# --------------------------------------------------------------------------
+# 3) Batch worker (runs in a separate process)
+# --------------------------------------------------------------------------
+# Stamp image bytes for this worker process, set once by _worker_init
+_worker_stamp_streams = {}
+# Where this worker reports (task id, pid) when it starts a task; see _run_timed
+_worker_started_queue = None
+
+
+def _worker_init(stamp_streams, started_queue):
+    """
+    Process-pool initializer. The stamp images are the same for every PDF,
+    so they're sent to each worker once here instead of inside every task.
+    """
+    global _worker_stamp_streams, _worker_started_queue
+    _worker_stamp_streams = stamp_streams
+    _worker_started_queue = started_queue
+
+
+def _run_timed(task_id, func, arg):
+    """
+    Pool entry point for work under the per-file deadline: runs `func(arg)`.
+    The pool marks a future as running as soon as it's queued for a worker,
+    so the worker itself reports when (and in which process) the task
+    really starts.
+    """
+    _worker_started_queue.put((task_id, os.getpid()))
+    return func(arg)
+
+
+def _quick_validate(pdf_path):
+    """
+    Cheap pre-check run in the pool before the real work: can MuPDF open
+    the file, is it a PDF, and does it have pages? Returns (path, ok, err).
+    """
+    try:
+        doc = fitz.open(pdf_path)
+        try:
+            if not doc.is_pdf:
+                return pdf_path, False, "not a PDF file"
+            if doc.needs_pass:
+                return pdf_path, False, "password protected"
+            if doc.page_count == 0:
+                return pdf_path, False, "no pages"
+        finally:
+            doc.close()
+    except Exception as e:
+        return pdf_path, False, str(e)
+    return pdf_path, True, ""
+
+
+def _process_one(task):
+    """
+    Process-pool entry point for one PDF. `task` is the picklable tuple
+    (pdf_path, output_pdf_path, word_output_path, personalization_word_path,
+     two_up_path, thumb_path, options, watermark_text); stamps come from
+    `_worker_init`. Kept at module level so spawned processes can import it.
+
+    Returns `(messages, docx_jobs)` as produced by `_process_pdf`; the Word
+    docs are written back in the GUI process by its writer threads.
+
+    A worker handles many PDFs over a batch. _process_pdf closes every
+    document it opens, and MuPDF's shared store (fonts, images, parsed
+    objects) is emptied after each file so worker memory stays flat. Don't
+    keep fitz objects (Pixmaps, Documents) alive across calls.
+    """
+    (pdf_path, output_pdf_path, word_output_path, personalization_word_path,
+     two_up_path, thumb_path, options, watermark_text) = task
+
+    try:
+        return _process_pdf(
+            pdf_path=pdf_path,
+            output_pdf_path=output_pdf_path,
+            word_output_path=word_output_path,
+            personalization_word_path=personalization_word_path,
+            stamp_streams=_worker_stamp_streams,
+            watermark_text=watermark_text,
+            options=options,
+            two_up_path=two_up_path,
+            thumb_path=thumb_path
+        )
+    finally:
+        fitz.TOOLS.store_shrink(100)
 
 
 # --------------------------------------------------------------------------
-# 3) GUI Class
+# 4) GUI Class
 # --------------------------------------------------------------------------
 class PDFBatchProcessorGUI(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("PDF Batch Processor")
-        self.geometry("750x750")
+        self.geometry("750x800")
         self.create_widgets()
 
+        # Paths currently in the PDF listbox: the list keeps display order,
+        # the set gives O(1) duplicate checks
+        self._pdf_ordered_list = []
+        self._pdf_set = set()
+
         # Dictionary of stamp images (add your new 'fed.png')
         self.stamp_images = {
             "gift": resource_path("gift_stamp.png"),
@@ -602,6 +965,55 @@ class PDFBatchProcessorGUI(tk.Tk):
             # New FedEx stamp
             "fedex": resource_path("fed.png"),
         }
+        # Read the stamp files once; every batch reuses the bytes
+        self.stamp_streams = load_stamp_streams(self.stamp_images)
+
+        # Status lines from the background batch thread; drained on the Tk
+        # main loop (None marks the end of a batch)
+        self._log_queue = queue.Queue()
+
+        # Lines waiting to be written to the status box (see log_message)
+        self._pending_log = []
+        self._log_flush_scheduled = False
+
+        # Word docs are written on these threads while the pool keeps
+        # processing PDFs; python-docx serialization is mostly disk I/O
+        self._writer_pool = ThreadPoolExecutor(max_workers=2)
+
+        # Ids that match pool tasks to their start notices (see _run_timed)
+        self._task_ids = itertools.count()
+
+        # One process pool for the app's lifetime; see _start_pool
+        self._closing = False
+        self._start_pool()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _start_pool(self):
+        """
+        (Re)creates `self._pool`, with a fresh start-notice queue for its workers.
+        A SimpleQueue writes each notice straight to the pipe, so it's delivered
+        even if the worker crashes right after.
+
+        Workers are started on demand and then kept between batches, so
+        process startup (slow with spawn on Windows) is only paid once.
+        """
+        if self._closing:
+            # The batch thread may outlive the window; don't leave a new pool behind
+            return
+        self._started_queue = multiprocessing.SimpleQueue()
+        self._pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                         initializer=_worker_init,
+                                         initargs=(self.stamp_streams, self._started_queue))
+
+    def _on_close(self):
+        self._closing = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        # shutdown() lets PDFs that are already running finish, and the interpreter
+        # waits for them on exit (forever, if one hangs). The pool workers are this
+        # app's only child processes, so stop them all.
+        for process in multiprocessing.active_children():
+            process.terminate()
+        self.destroy()
 
     def create_widgets(self):
         # Frame: select PDFs
@@ -628,6 +1040,14 @@ class PDFBatchProcessorGUI(tk.Tk):
         self.watermark_entry = tk.Entry(watermark_frame, width=30)
         self.watermark_entry.pack(side=tk.LEFT, padx=5)
 
+        # Frame: Per-file timeout
+        timeout_frame = tk.Frame(self)
+        timeout_frame.pack(pady=5)
+        tk.Label(timeout_frame, text="Per-file Timeout (seconds):").pack(side=tk.LEFT, padx=5)
+        self.timeout_entry = tk.Entry(timeout_frame, width=8)
+        self.timeout_entry.insert(0, "120")
+        self.timeout_entry.pack(side=tk.LEFT, padx=5)
+
         # Frame: Checkboxes (options)
         options_frame = tk.LabelFrame(self, text="Select Processing Options")
         options_frame.pack(pady=10, fill='x', padx=10)
@@ -667,9 +1087,14 @@ class PDFBatchProcessorGUI(tk.Tk):
         tk.Checkbutton(options_frame, text="Generate 2-up and thumbnail PDFs",
                        variable=self.generate_2up_thumbs_var).pack(anchor='w')
 
+        self.deep_clean_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(options_frame, text="Deep-clean output PDFs (rewrite page content streams, slower)",
+                       variable=self.deep_clean_var).pack(anchor='w')
+
         # Process button
-        tk.Button(self, text="Process Files", command=self.process_files,
-                  bg="green", fg="white", width=20).pack(pady=15)
+        self.process_button = tk.Button(self, text="Process Files", command=self.process_files,
+                                        bg="green", fg="white", width=20)
+        self.process_button.pack(pady=15)
 
         # Status text
         self.status_text = tk.Text(self, height=12, width=85)
@@ -681,18 +1106,20 @@ class PDFBatchProcessorGUI(tk.Tk):
             title="Select PDF Files",
             filetypes=[("PDF Files", "*.pdf")]
         )
-        if files:
-            current_files = list(self.pdf_listbox.get(0, tk.END))
-            for f in files:
-                if len(current_files) >= 20:
-                    messagebox.showwarning("Limit Reached", "You can only select up to 20 PDF files.")
-                    break
-                if f not in current_files:
-                    self.pdf_listbox.insert(tk.END, f)
-                    current_files.append(f)
+        for f in files:
+            if f in self._pdf_set:
+                continue
+            if len(self._pdf_set) >= 20:
+                messagebox.showwarning("Limit Reached", "You can only select up to 20 PDF files.")
+                break
+            self.pdf_listbox.insert(tk.END, f)
+            self._pdf_ordered_list.append(f)
+            self._pdf_set.add(f)
 
     def clear_pdf_list(self):
         self.pdf_listbox.delete(0, tk.END)
+        self._pdf_ordered_list.clear()
+        self._pdf_set.clear()
 
     def browse_output_dir(self):
         directory = filedialog.askdirectory(title="Select Output Directory")
@@ -701,23 +1128,49 @@ class PDFBatchProcessorGUI(tk.Tk):
             self.out_dir_entry.insert(0, directory)
 
     def log_message(self, msg):
+        # Buffer the line; everything logged within 50 ms is written in one go
+        self._pending_log.append(msg)
+        if not self._log_flush_scheduled:
+            self._log_flush_scheduled = True
+            self.after(50, self._flush_logs)
+
+    def _flush_logs(self):
+        self._log_flush_scheduled = False
+        pending, self._pending_log = self._pending_log, []
+        if not pending:
+            return
         self.status_text.config(state=tk.NORMAL)
-        self.status_text.insert(tk.END, msg + "\n")
+        self.status_text.insert(tk.END, "\n".join(pending) + "\n")
         self.status_text.config(state=tk.DISABLED)
         self.status_text.see(tk.END)
 
     def process_files(self):
-        pdf_files = list(self.pdf_listbox.get(0, tk.END))
+        # Copy, so later Browse/Clear clicks don't change a running batch
+        pdf_files = list(self._pdf_ordered_list)
         out_dir = self.out_dir_entry.get().strip()
         if not pdf_files:
             messagebox.showerror("Error", "No PDF files selected.")
             return
-        if not out_dir or not os.path.isdir(out_dir):
+        # Stat the output directory once here; workers get the resolved absolute path
+        try:
+            is_dir = bool(out_dir) and stat.S_ISDIR(os.stat(out_dir).st_mode)
+        except OSError:
+            is_dir = False
+        if not is_dir:
             messagebox.showerror("Error", "Please select a valid output directory.")
             return
+        out_dir = os.path.abspath(out_dir)
 
         watermark_text = self.watermark_entry.get().strip()
 
+        try:
+            per_file_timeout = float(self.timeout_entry.get().strip())
+        except ValueError:
+            per_file_timeout = 0
+        if per_file_timeout <= 0:
+            messagebox.showerror("Error", "Per-file timeout must be a positive number of seconds.")
+            return
+
         # Gather checkbox options into a dictionary
         options = {
             'crop_pages':                self.crop_pages_var.get(),
@@ -729,39 +1182,223 @@ class PDFBatchProcessorGUI(tk.Tk):
             'add_stamps':                self.add_stamps_var.get(),
             'apply_watermark':           self.apply_watermark_var.get(),
             'generate_2up_thumbs':       self.generate_2up_thumbs_var.get(),
+            'deep_clean_output':         self.deep_clean_var.get(),
         }
 
+        # The batch runs on its own thread so the Tk main loop stays responsive;
+        # the button stays disabled so only one batch runs at a time
+        self.process_button.config(state=tk.DISABLED)
         self.log_message("Processing started...")
-
-        for pdf in pdf_files:
-            base = os.path.splitext(os.path.basename(pdf))[0]
-            output_pdf_path = os.path.join(out_dir, base + "_modified.pdf")
-            word_output_path = os.path.join(out_dir, base + "_GiftMessages.docx")
-            personalization_word_path = os.path.join(out_dir, base + "_Personalizations.docx")
-
-            # 1) Process the main PDF based on checkboxes
-            result = process_pdf_file(
-                pdf_path=pdf,
-                output_pdf_path=output_pdf_path,
-                word_output_path=word_output_path,
-                personalization_word_path=personalization_word_path,
-                stamp_images=self.stamp_images,
-                watermark_text=watermark_text,
-                options=options
-            )
-            self.log_message(result)
-
-            # 2) Generate 2-up and thumbnail only if selected
-            if options['generate_2up_thumbs']:
-                two_up_path = os.path.join(out_dir, base + "_2up.pdf")
-                create_two_up_pdf(output_pdf_path, two_up_path)
-                self.log_message(f"2-up PDF created for {base}")
-
-                thumb_path = os.path.join(out_dir, base + "_thumb.pdf")
-                create_six_page_thumbnail_pdf(output_pdf_path, thumb_path)
-                self.log_message(f"Thumbnail PDF created for {base}")
-
+        threading.Thread(
+            target=self._run_batch,
+            args=(pdf_files, out_dir, watermark_text, options, per_file_timeout),
+            daemon=True
+        ).start()
+        self.after(100, self._drain_log_queue)
+
+    def _run_batch(self, pdf_files, out_dir, watermark_text, options, per_file_timeout):
+        """
+        Runs on the background batch thread. Tk widgets must only be touched
+        from the main loop, so every status line goes through `self._log_queue`.
+
+        A PDF still running `per_file_timeout` seconds after its worker picked
+        it up is logged and abandoned so it can't hold up the rest of the batch.
+        """
+        try:
+            # Build one picklable task tuple per PDF so each can run in its own process.
+            # Output names come from the basename alone, so two inputs with the same
+            # name (from different folders) would overwrite each other's outputs.
+            tasks = []
+            seen_bases = set()
+            for pdf in pdf_files:
+                base = os.path.splitext(os.path.basename(pdf))[0]
+                if base in seen_bases:
+                    self._log_queue.put(f"Skipping duplicate basename '{base}': {pdf}")
+                    continue
+                seen_bases.add(base)
+                tasks.append((
+                    pdf,
+                    os.path.join(out_dir, base + "_modified.pdf"),
+                    os.path.join(out_dir, base + "_GiftMessages.docx"),
+                    os.path.join(out_dir, base + "_Personalizations.docx"),
+                    os.path.join(out_dir, base + "_2up.pdf"),
+                    os.path.join(out_dir, base + "_thumb.pdf"),
+                    options,
+                    watermark_text,
+                ))
+
+            writes = {}
+            valid = set()
+
+            def validated(pdf, future):
+                try:
+                    _, ok, err = future.result()
+                except Exception as e:
+                    ok, err = False, e
+                if ok:
+                    valid.add(pdf)
+                else:
+                    self._log_queue.put(f"Skipping invalid PDF '{os.path.basename(pdf)}': {err}")
+
+            def processed(pdf, future):
+                try:
+                    messages, docx_jobs = future.result()
+                except Exception as e:
+                    # Worker process died (e.g. crashed inside MuPDF)
+                    messages, docx_jobs = [f"Error processing '{os.path.basename(pdf)}': {e}"], []
+                for msg in messages:
+                    self._log_queue.put(msg)
+                for job in docx_jobs:
+                    writes[self._writer_pool.submit(save_rows_docx, *job)] = job[2]
+
+            # Report unreadable files within seconds and keep them out of the heavy step.
+            # Checked in the pool rather than on threads (MuPDF isn't thread-safe), and
+            # under the same per-file deadline, since fitz.open itself can hang on a
+            # badly broken file (e.g. while repairing its xref).
+            self._run_with_deadline(_quick_validate, [(task[0], task[0]) for task in tasks],
+                                    per_file_timeout, validated)
+            tasks = [task for task in tasks if task[0] in valid]
+
+            # Report each PDF (incl. its 2-up/thumbnail) as soon as its worker finishes
+            self._run_with_deadline(_process_one, [(task[0], task) for task in tasks],
+                                    per_file_timeout, processed)
+
+            # The batch isn't done until every Word doc is on disk
+            for write in as_completed(writes):
+                try:
+                    write.result()
+                except Exception as e:
+                    self._log_queue.put(f"Error writing '{os.path.basename(writes[write])}': {e}")
+        except Exception as e:
+            self._log_queue.put(f"Batch stopped: {e}")
+        finally:
+            self._log_queue.put(None)
+
+    def _run_with_deadline(self, func, jobs, per_file_timeout, on_done):
+        """
+        Runs `func(arg)` in the pool for every `(pdf, arg)` in `jobs` and calls
+        `on_done(pdf, future)` (on this thread) once for each of them, except
+        jobs dropped after a timeout.
+
+        A job still running `per_file_timeout` seconds after a worker started it
+        is logged and its worker killed. Losing a worker breaks the whole pool,
+        so the pool is replaced and the jobs it still held are submitted again.
+        The same happens when a PDF crashes its worker; only the crashing job
+        is failed. When several jobs were running at the time and it's unclear
+        which one crashed, each of them is retried on its own.
+        """
+        waiting = list(jobs)
+        suspects = []
+        while (waiting or suspects) and not self._closing:
+            if waiting:
+                round_jobs = waiting
+            else:
+                round_jobs = [suspects.pop(0)]
+            killed, unstarted, running = self._run_round(func, round_jobs, per_file_timeout, on_done)
+
+            waiting = [job for (job, future) in unstarted]
+            if killed:
+                # The kill broke the pool; nothing else was at fault
+                waiting += [job for (job, future) in running]
+            elif len(running) == 1:
+                # Only one job was running when a worker died: that's the crash
+                (job, future), = running
+                on_done(job[0], future)
+            elif running:
+                suspects += [job for (job, future) in running]
+            elif unstarted:
+                # The pool broke without running anything (e.g. workers failing
+                # to start); retrying would just fail the same way
+                for (job, future) in unstarted:
+                    on_done(job[0], future)
+                waiting = []
+
+    def _run_round(self, func, jobs, per_file_timeout, on_done):
+        """
+        Submits `jobs` to the current pool and reports them through `on_done`
+        until all are done or a worker is lost (killed after a timeout, or
+        crashed). Returns `(killed, unstarted, running)`: whether a worker was
+        killed, plus the `(job, future)` pairs a lost pool never started or
+        was running when it broke (the pool has been replaced by then).
+        """
+        futures = {}
+        by_task_id = {}
+        for job in jobs:
+            task_id = next(self._task_ids)
+            future = self._pool.submit(_run_timed, task_id, func, job[1])
+            futures[future] = job
+            by_task_id[task_id] = future
+
+        started = {}    # future => (worker pid, start time)
+
+        def note_started():
+            while not self._started_queue.empty():
+                task_id, pid = self._started_queue.get()
+                if task_id in by_task_id:
+                    started[by_task_id[task_id]] = (pid, time.monotonic())
+
+        killed = False
+        lost_worker = False
+        pending = set(futures)
+        while pending and not lost_worker:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            note_started()
+            for future in done:
+                if future.cancelled() or isinstance(future.exception(), BrokenProcessPool):
+                    # A worker died (or the window closed); sorted out with the rest below
+                    lost_worker = True
+                    pending.add(future)
+                else:
+                    on_done(futures[future][0], future)
+
+            now = time.monotonic()
+            for future in list(pending):
+                if future in started and not future.done() \
+                        and now - started[future][1] > per_file_timeout:
+                    # A worker stuck on a PDF never returns by itself; stop it now
+                    pending.discard(future)
+                    self._log_queue.put(
+                        f"Timeout on '{os.path.basename(futures[future][0])}', skipping")
+                    try:
+                        os.kill(started[future][0], signal.SIGTERM)
+                    except OSError:
+                        pass  # exited in the meantime
+                    killed = lost_worker = True
+
+        if not lost_worker:
+            return False, [], []
+
+        # Let the broken pool fail everything it still held, then start a new one
+        self._pool.shutdown()
+        note_started()
+        self._start_pool()
+
+        unstarted, running = [], []
+        for future in pending:
+            if not (future.cancelled() or isinstance(future.exception(), BrokenProcessPool)):
+                on_done(futures[future][0], future)
+            elif future in started:
+                running.append((futures[future], future))
+            else:
+                unstarted.append((futures[future], future))
+        return killed, unstarted, running
+
+    def _drain_log_queue(self):
+        """Log everything the batch thread queued; re-arms itself until the batch ends."""
+        while True:
+            try:
+                msg = self._log_queue.get_nowait()
+            except queue.Empty:
+                break
+            if msg is None:
+                self._batch_finished()
+                return
+            self.log_message(msg)
+        self.after(100, self._drain_log_queue)
+
+    def _batch_finished(self):
         self.log_message("All files processed!")
+        self.process_button.config(state=tk.NORMAL)
         messagebox.showinfo("Done", "Processing complete for all selected files.")
 
 
@@ -769,5 +1406,7 @@ class PDFBatchProcessorGUI(tk.Tk):
 # Main
 # --------------------------------------------------------------------------
 if __name__ == "__main__":
+    # Required so the frozen (PyInstaller) app can spawn pool workers
+    multiprocessing.freeze_support()
     app = PDFBatchProcessorGUI()
     app.mainloop()